@@ -1,92 +1,221 @@
 import readchar
+import atexit
 import os
 import random
+import sys
+from collections import deque
 POS_X = 0
 POS_Y = 1
 MAP_HEIGHT = 10
 MAP_WIDTH = 20
-my_position = [3, 1]
-item_positions = []
+MAP_CELLS = MAP_WIDTH * MAP_HEIGHT
 NUM_OF_MAP_OBJECTS = 20
-tail_length = 0
-tail = []
-end_game = False
+# Every position is a cell packed as y * MAP_WIDTH + x
+START_CELL = 1 * MAP_WIDTH + 3
+
+
+# Movement per key as (dx, dy)
+DIR_DELTA = {"w": (0, -1), "a": (-1, 0), "s": (0, 1), "d": (1, 0)}
+
+# Arrow keys behave like WASD; built once instead of on every key read
+ARROW_MAP = {readchar.key.UP: "w", readchar.key.LEFT: "a",
+             readchar.key.DOWN: "s", readchar.key.RIGHT: "d"}
+
+CLEAR_SCREEN = b"\x1b[H\x1b[2J"
+MOVE_TO = b"\x1b[%d;%dH"
+DRAW_CELL_AT = b"\x1b[%d;%dH%c"
+# Play on the alternate screen so the shell's scrollback is left untouched
+START_SCREEN = b"\x1b[?1049h\x1b[?25l"
+END_SCREEN = b"\x1b[?25h\x1b[?1049l"
+# Synchronized output: supporting terminals show each frame all at once
+BEGIN_FRAME = b"\x1b[?2026h"
+END_FRAME = b"\x1b[?2026l"
+
+# Cell glyphs as the single byte drawn in the middle of each cell
+EMPTY_CELL = ord(" ")
+ITEM_CELL = ord("*")
+SNAKE_CELL = ord("@")
+
+# The whole board lives in one preallocated buffer with its borders and
+# newlines already in place; drawing only pokes the cell glyph bytes
+BORDER = b"+" + b"-" * MAP_WIDTH * 3 + b"+\n"
+ROW_LENGTH = MAP_WIDTH * 3 + 3
+frame_buffer = bytearray(
+    BORDER + (b"|" + b" " * MAP_WIDTH * 3 + b"|\n") * MAP_HEIGHT + BORDER)
+
+
+def cell_of(x, y):
+    return y * MAP_WIDTH + x
+
+
+# Where the head lands from every cell for each key, wrapping around the
+# map edges, so a move is a single index instead of decode/wrap/encode
+NEXT_CELL = {
+    direction: [cell_of((x + delta[POS_X]) % MAP_WIDTH,
+                        (y + delta[POS_Y]) % MAP_HEIGHT)
+                for y in range(MAP_HEIGHT) for x in range(MAP_WIDTH)]
+    for direction, delta in DIR_DELTA.items()}
+
+
+def enable_ansi():
+    # Windows 10+ consoles only honour escape codes with VT processing on
+    if os.name != "nt":
+        return
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+    mode = ctypes.c_ulong()
+    if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        kernel32.SetConsoleMode(handle, mode.value | 0x0004)
+
+
+def restore_terminal():
+    atexit.unregister(restore_terminal)
+    sys.stdout.buffer.write(END_SCREEN)
+    sys.stdout.buffer.flush()
+
+
+def play():
+    # Game state lives in locals, which are much cheaper to reach than
+    # module-level names in the hot loop
+    tail_length = 0
+    end_game = False
+    game_over_message = ""
+
+    my_cell = START_CELL
+    # Items only live in the board grid; these just count them and the
+    # cells that are still empty
+    item_count = 0
+    free_count = MAP_CELLS - 1
+    tail = deque(maxlen=0)
+
+    # Board glyphs, kept up to date as things move instead of being redrawn
+    # from scratch; dirty_cells collects the cells touched since the last frame
+    grid = bytearray([EMPTY_CELL]) * MAP_CELLS
+    grid[my_cell] = SNAKE_CELL
+    dirty_cells = set()
+
+    # What the head found in the cell it last moved into; the grid doubles as
+    # the occupancy map for collisions and spawning
+    entered = EMPTY_CELL
+    first_frame = True
+
+    # A private generator avoids going through the random module's shared
+    # instance on every spawn
+    rng = random.Random()
+
+    while not end_game:
+        # Spawn missing items away from the snake; on most turns nothing was
+        # eaten and this is skipped. While most of the board is free,
+        # rejection-sample batches of cells (capped, so a busy board just fills
+        # up over the next turns); once it gets crowded, sample straight from
+        # the free cells so the loop can never stall
+        if item_count < NUM_OF_MAP_OBJECTS and free_count:
+            missing = min(NUM_OF_MAP_OBJECTS - item_count, free_count)
+
+            if free_count * 2 > MAP_CELLS:
+                for new_cell in rng.choices(range(MAP_CELLS), k=missing * 8):
+                    if grid[new_cell] == EMPTY_CELL:
+                        item_count += 1
+                        free_count -= 1
+                        grid[new_cell] = ITEM_CELL
+                        dirty_cells.add(new_cell)
+                        missing -= 1
+                        if not missing:
+                            break
+            else:
+                free_cells = [cell for cell, glyph in enumerate(grid)
+                              if glyph == EMPTY_CELL]
+                for new_cell in rng.sample(free_cells, missing):
+                    item_count += 1
+                    free_count -= 1
+                    grid[new_cell] = ITEM_CELL
+                    dirty_cells.add(new_cell)
+
+        # Eat the item the head moved onto, or die if it ran into the tail
+        if entered == ITEM_CELL:
+            item_count -= 1
+            tail_length += 1
+            tail = deque(tail, maxlen=tail_length)
+        elif entered == SNAKE_CELL:
+            game_over_message = "Has muerto"
+            end_game = True
+
+        # Draw the map
+        if first_frame:
+            # First frame: clear the screen and paint the whole board, copying
+            # each row into every third byte of its line in the frame buffer
+            for row_start in range(0, MAP_CELLS, MAP_WIDTH):
+                offset = len(BORDER) + row_start // MAP_WIDTH * ROW_LENGTH + 2
+                frame_buffer[offset:offset + MAP_WIDTH * 3:3] = \
+                    grid[row_start:row_start + MAP_WIDTH]
+
+            frame = CLEAR_SCREEN + frame_buffer
+        else:
+            # Afterwards only repaint the cells that changed since last frame
+            frame = bytearray()
+
+            for cell in dirty_cells:
+                row, column = divmod(cell, MAP_WIDTH)
+                frame += DRAW_CELL_AT % (row + 2, column * 3 + 3, grid[cell])
+
+            # Park the cursor under the board for any message
+            frame += MOVE_TO % (MAP_HEIGHT + 3, 1)
+
+        frame += game_over_message.encode()
+
+        first_frame = False
+        dirty_cells.clear()
+
+        # Emit the whole frame with a single write
+        sys.stdout.buffer.write(BEGIN_FRAME + frame + END_FRAME)
+        sys.stdout.buffer.flush()
+
+        # Ask user where he wants to move
+        #direction = input("¿Donde te quieres mover? [AWSD]")
+        key = readchar.readkey()
+        if isinstance(key, bytes):
+            key = key.decode()
+        direction = ARROW_MAP.get(key, key)
+
+        next_cells = NEXT_CELL.get(direction)
+        entered = EMPTY_CELL
+
+        if next_cells:
+            # The deque drops its oldest piece by itself once it is full
+            if tail_length:
+                if len(tail) == tail_length:
+                    grid[tail[-1]] = EMPTY_CELL
+                    dirty_cells.add(tail[-1])
+                    free_count += 1
+                tail.appendleft(my_cell)
+            else:
+                grid[my_cell] = EMPTY_CELL
+                dirty_cells.add(my_cell)
+                free_count += 1
+
+            my_cell = next_cells[my_cell]
+            entered = grid[my_cell]
+            if entered == EMPTY_CELL:
+                free_count -= 1
+            grid[my_cell] = SNAKE_CELL
+            dirty_cells.add(my_cell)
+        elif direction == "q":
+            end_game = True
+
+    return game_over_message
+
 
 #Generate random objects
 
 
+enable_ansi()
+sys.stdout.buffer.write(START_SCREEN)
+atexit.register(restore_terminal)
+
+game_over_message = play()
+restore_terminal()
 
-while not end_game:
-    while len(item_positions) < NUM_OF_MAP_OBJECTS:
-        new_position = [random.randint(
-            0, MAP_WIDTH), random.randint(0, MAP_HEIGHT)]
-
-        if new_position not in item_positions and new_position != my_position:
-            item_positions.append(new_position)
-    # Draw the map
-    print("+"+"-"*MAP_WIDTH*3 + "+")
-
-    for coordinate_y in range(MAP_HEIGHT):  # Empieza en el 1
-        print("|", end="")
-        for coordinate_x in range(MAP_WIDTH):  # Empieza en el 1
-
-            char_to_draw = " "
-            object_in_cell = None
-            tail_in_cell = None
-
-            for item_position in item_positions:
-                if item_position[POS_X] == coordinate_x and item_position[POS_Y] == coordinate_y:
-                    char_to_draw = "*"
-                    object_in_cell = item_position
-
-            for tail_piece in tail:
-                if tail_piece[POS_X] == coordinate_x and tail_piece[POS_Y] == coordinate_y:
-                    char_to_draw = "@"
-                    tail_in_cell = tail_piece
-
-            if my_position[POS_X] == coordinate_x and my_position[POS_Y] == coordinate_y:
-                char_to_draw = "@"
-
-                if object_in_cell:
-                    item_positions.remove(object_in_cell)
-                    tail_length += 1
-
-                if tail_in_cell:
-                    print("Has muerto")
-                    end_game = True
-
-            print(" {} ".format(char_to_draw), end="")
-
-        print("|")
-
-    print("+"+"-"*MAP_WIDTH*3 + "+")
-
-    # Ask user where he wants to move
-    #direction = input("¿Donde te quieres mover? [AWSD]")
-    direction = readchar.readchar().decode()
-
-    if direction == "w":
-        tail.insert(0, my_position.copy())
-        tail = tail[:tail_length]
-        my_position[POS_Y] -= 1
-        my_position[POS_Y] %= MAP_HEIGHT
-    elif direction == "a":
-        tail.insert(0, my_position.copy())
-        tail = tail[:tail_length]
-        my_position[POS_X] -= 1
-        my_position[POS_X] %= MAP_WIDTH
-    elif direction == "s":
-        tail.insert(0, my_position.copy())
-        tail = tail[:tail_length]
-        
-        my_position[POS_Y] += 1
-        my_position[POS_Y] %= MAP_HEIGHT
-    elif direction == "d":
-        tail.insert(0, my_position.copy())
-        tail = tail[:tail_length]
-        my_position[POS_X] += 1
-        my_position[POS_X] %= MAP_WIDTH
-    elif direction == "q":
-        end_game = True
-
-    os.system("cls")
+if game_over_message:
+    print(game_over_message)